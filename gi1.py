@@ -1,9 +1,15 @@
 # app.py — Galactic Operations Dashboard (Minimal)
+import functools
 import time
-from datetime import datetime
-import random
 import streamlit as st
 import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+
+HIST_LEN = 300  # samples kept for the trend chart (5 min at the 1 s refresh)
+# Comms status is carried as an int code so alert checks compare ints, not strings
+COMM_CODE = {"Outage": 0, "Degraded": 1, "Nominal": 2}
+COMM_NAME = ["Outage", "Degraded", "Nominal"]
 
 st.set_page_config(page_title="Galactic Ops Dashboard", page_icon="🛰️", layout="wide")
 
@@ -23,101 +29,149 @@ with st.sidebar:
     th_batt = st.slider("Battery low threshold", 0, 100, 30)
     th_solar = st.slider("Solar output low threshold (kW)", 0, 200, 60)
     th_temp_hi = st.slider("Coolant temp HIGH (°C)", 40, 200, 120)
-    th_comm = st.selectbox("Comms minimum status", ["Outage","Degraded","Nominal"], index=1)
+    th_comm = st.selectbox("Comms minimum status", COMM_NAME, index=1)
 
 # -----------------------------
 # Telemetry Source (demo)
 # -----------------------------
-@st.cache_data(show_spinner=False)
-def initial_state():
-    return {
-        "ship": "GI-01 ORION",
-        "fuel_pct": 76,
-        "battery_pct": 88,
-        "solar_kw": 95,
-        "coolant_c": 87,
-        "comms": "Nominal",
-    }
-
-state = initial_state().copy()
-
-def apply_jitter(val, pct):
-    if pct <= 0: return val
-    span = val * pct / 100.0
-    return max(0, val + random.uniform(-span, span))
-
-# One-shot jitter per render (keep deterministic per run)
-state["fuel_pct"] = round(apply_jitter(state["fuel_pct"], jitter), 1)
-state["battery_pct"] = round(apply_jitter(state["battery_pct"], jitter), 1)
-state["solar_kw"] = round(apply_jitter(state["solar_kw"], jitter), 1)
-state["coolant_c"] = round(apply_jitter(state["coolant_c"], jitter), 1)
-state["comms"] = random.choice(["Nominal","Nominal","Nominal","Degraded"])  # biased toward Nominal
+BASELINE = {
+    "ship": "GI-01 ORION",
+    "fuel_pct": 76,
+    "battery_pct": 88,
+    "solar_kw": 95,
+    "coolant_c": 87,
+}
+
+JITTER_KEYS = ("fuel_pct", "battery_pct", "solar_kw", "coolant_c")
+JITTER_BASE = np.array([BASELINE[k] for k in JITTER_KEYS], dtype=np.float64)
+
+def apply_jitter(base, pct, rng):
+    # One uniform draw for every channel; spans collapse to 0 when pct is 0
+    spans = base * (pct / 100.0)
+    return np.maximum(0.0, base + rng.uniform(-spans, spans))
 
 # -----------------------------
-# KPIs
+# Alert checks
 # -----------------------------
-k1, k2, k3, k4, k5 = st.columns(5)
-k1.metric("⛽ Fuel", f"{state['fuel_pct']} %", help="Remaining propellant")
-k2.metric("🔋 Battery", f"{state['battery_pct']} %", help="Main bus SOC")
-k3.metric("☀️ Solar Output", f"{state['solar_kw']} kW", help="Array instantaneous output")
-k4.metric("❄️ Coolant Temp", f"{state['coolant_c']} °C", help="Primary loop temperature")
-k5.metric("📡 Comms", state["comms"], help="Link status to ground")
-
-st.divider()
+@functools.lru_cache(maxsize=128)
+def _status_bad_pure(fuel, batt, solar, coolant, comm_code,
+                     th_fuel, th_batt, th_solar, th_temp_hi, th_comm_code) -> tuple[str, ...]:
+    msgs = []
+    if fuel <= th_fuel: msgs.append(f"Fuel low: {fuel}% ≤ {th_fuel}%")
+    if batt <= th_batt: msgs.append(f"Battery low: {batt}% ≤ {th_batt}%")
+    if solar <= th_solar: msgs.append(f"Solar output low: {solar} kW ≤ {th_solar} kW")
+    if coolant >= th_temp_hi: msgs.append(f"Coolant temp high: {coolant} °C ≥ {th_temp_hi} °C")
+    if comm_code < th_comm_code:
+        msgs.append(f"Comms below minimum: {COMM_NAME[comm_code]} < {COMM_NAME[th_comm_code]}")
+    return tuple(msgs)
+
+def status_bad(state):
+    # With jitter at 0 and the sliders untouched, every fragment timer run
+    # passes the same values and hits the cache
+    return _status_bad_pure(
+        state["fuel_pct"], state["battery_pct"], state["solar_kw"], state["coolant_c"], state["comm_code"],
+        th_fuel, th_batt, th_solar, th_temp_hi, COMM_CODE[th_comm],
+    )
 
 # -----------------------------
-# Visuals
+# Live telemetry panel — reruns on its own timer; sidebar and helpers stay put
 # -----------------------------
-c1, c2 = st.columns([2,1])
-
-with c1:
-    st.markdown("#### Systems Snapshot")
-    # Small time series buffer stored in session_state for the session lifetime
-    if "ts_hist" not in st.session_state:
-        st.session_state.ts_hist = pd.DataFrame(columns=["t","Fuel%","Battery%","Solar(kW)","Coolant(°C)"])
-    new_row = {
-        "t": datetime.utcnow().strftime("%H:%M:%S"),
-        "Fuel%": state["fuel_pct"],
-        "Battery%": state["battery_pct"],
-        "Solar(kW)": state["solar_kw"],
-        "Coolant(°C)": state["coolant_c"],
+@st.fragment(run_every=1 if autoupdate else None)
+def telemetry_panel():
+    # Telemetry is resampled only when the auto-update tick advances, so
+    # sidebar tweaks redraw the same sample instead of fresh noise. The tick
+    # moves on the fragment's own timer runs only; full reruns (widget
+    # changes) set "full_rerun" just before calling the panel.
+    full_rerun = st.session_state.pop("full_rerun", False)
+    if autoupdate and not full_rerun:
+        st.session_state.tick = st.session_state.get("tick", 0) + 1
+    tick = st.session_state.get("tick", 0)
+    rng = np.random.default_rng(tick)
+
+    jittered = np.round(apply_jitter(JITTER_BASE, jitter, rng), 1).tolist()
+    state = {
+        **BASELINE,
+        **dict(zip(JITTER_KEYS, jittered)),
+        "comm_code": COMM_CODE[rng.choice(["Nominal","Nominal","Nominal","Degraded"])],  # biased toward Nominal
     }
-    st.session_state.ts_hist = pd.concat([st.session_state.ts_hist, pd.DataFrame([new_row])], ignore_index=True)
-    st.line_chart(st.session_state.ts_hist.set_index("t"))
 
-with c2:
-    st.markdown("#### Gauges")
-    st.progress(int(state["fuel_pct"]), text="Fuel")
-    st.progress(int(state["battery_pct"]), text="Battery")
-    st.progress(int(min(100, state["solar_kw"])), text="Solar (scaled)")
-    st.progress(int(min(100, 200 - state["coolant_c"])), text="Thermal Margin (derived)")
+    # -----------------------------
+    # KPIs
+    # -----------------------------
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric("⛽ Fuel", f"{state['fuel_pct']} %", help="Remaining propellant")
+    k2.metric("🔋 Battery", f"{state['battery_pct']} %", help="Main bus SOC")
+    k3.metric("☀️ Solar Output", f"{state['solar_kw']} kW", help="Array instantaneous output")
+    k4.metric("❄️ Coolant Temp", f"{state['coolant_c']} °C", help="Primary loop temperature")
+    k5.metric("📡 Comms", COMM_NAME[state["comm_code"]], help="Link status to ground")
 
-st.divider()
+    st.divider()
 
-# -----------------------------
-# Alerts
-# -----------------------------
-def status_bad():
-    msgs = []
-    if state["fuel_pct"] <= th_fuel: msgs.append(f"Fuel low: {state['fuel_pct']}% ≤ {th_fuel}%")
-    if state["battery_pct"] <= th_batt: msgs.append(f"Battery low: {state['battery_pct']}% ≤ {th_batt}%")
-    if state["solar_kw"] <= th_solar: msgs.append(f"Solar output low: {state['solar_kw']} kW ≤ {th_solar} kW")
-    if state["coolant_c"] >= th_temp_hi: msgs.append(f"Coolant temp high: {state['coolant_c']} °C ≥ {th_temp_hi} °C")
-    comm_order = {"Outage":0,"Degraded":1,"Nominal":2}
-    if comm_order[state["comms"]] < comm_order[th_comm]:
-        msgs.append(f"Comms below minimum: {state['comms']} < {th_comm}")
-    return msgs
-
-issues = status_bad()
-if issues:
-    st.error("⚠️ Alerts detected:\n- " + "\n- ".join(issues))
-else:
-    st.success("All systems nominal.")
+    # -----------------------------
+    # Visuals
+    # -----------------------------
+    c1, c2 = st.columns([2,1])
+
+    with c1:
+        st.markdown("#### Systems Snapshot")
+        # Fixed-size ring buffer stored in session_state for the session lifetime
+        if "ring" not in st.session_state:
+            st.session_state.ring = {
+                "t": np.empty(HIST_LEN, np.int64),  # epoch ns
+                "Fuel%": np.empty(HIST_LEN, np.float64),
+                "Battery%": np.empty(HIST_LEN, np.float64),
+                "Solar(kW)": np.empty(HIST_LEN, np.float64),
+                "Coolant(°C)": np.empty(HIST_LEN, np.float64),
+            }
+            st.session_state.head = 0
+            st.session_state.count = 0
+        ring = st.session_state.ring
+        # One sample per tick; a rerun on the same tick (e.g. a slider change)
+        # overwrites the newest sample so the chart tracks the KPIs
+        if st.session_state.get("hist_tick") != tick:
+            st.session_state.hist_tick = tick
+            idx = st.session_state.head % HIST_LEN
+            st.session_state.head += 1
+            st.session_state.count = min(st.session_state.count + 1, HIST_LEN)
+        else:
+            idx = (st.session_state.head - 1) % HIST_LEN
+        ring["t"][idx] = time.time_ns()
+        ring["Fuel%"][idx] = state["fuel_pct"]
+        ring["Battery%"][idx] = state["battery_pct"]
+        ring["Solar(kW)"][idx] = state["solar_kw"]
+        ring["Coolant(°C)"][idx] = state["coolant_c"]
+        # Oldest-to-newest slot order; only materialize a DataFrame at chart time
+        order = (np.arange(st.session_state.count) + st.session_state.head - st.session_state.count) % HIST_LEN
+        hist = pd.DataFrame({k: v[order] for k, v in ring.items()})
+        hist["t"] = pd.to_datetime(hist["t"], unit="ns")
+        st.line_chart(hist.set_index("t"))
+
+    with c2:
+        st.markdown("#### Gauges")
+        # One horizontal bar chart instead of four separate progress widgets
+        gauge_fig = go.Figure(go.Bar(
+            x=[state["fuel_pct"], state["battery_pct"], min(100, state["solar_kw"]), min(100, 200 - state["coolant_c"])],
+            y=["Fuel", "Battery", "Solar (scaled)", "Thermal Margin (derived)"],
+            orientation="h"
+        ))
+        gauge_fig.update_layout(
+            xaxis_range=[0, 100],
+            yaxis_autorange="reversed",
+            height=260,
+            margin=dict(l=10, r=10, t=10, b=10)
+        )
+        st.plotly_chart(gauge_fig, use_container_width=True, key="gauges_bar")
 
-# -----------------------------
-# Auto-update loop (optional)
-# -----------------------------
-if autoupdate:
-    time.sleep(1)
-    st.rerun()
+    st.divider()
 
+    # -----------------------------
+    # Alerts
+    # -----------------------------
+    issues = status_bad(state)
+    if issues:
+        st.error("⚠️ Alerts detected:\n- " + "\n- ".join(issues))
+    else:
+        st.success("All systems nominal.")
+
+st.session_state.full_rerun = True
+telemetry_panel()
@@ -1,11 +1,16 @@
 # app.py — Galactic Operations Dashboard (Plotly Gauges)
+import functools
 import time
-from datetime import datetime
-import random
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 
+HIST_LEN = 300  # samples kept for the trend chart (10 min at the 2 s refresh)
+# Comms status is carried as an int code so alert checks compare ints, not strings
+COMM_CODE = {"Outage": 0, "Degraded": 1, "Nominal": 2}
+COMM_NAME = ["Outage", "Degraded", "Nominal"]
+
 st.set_page_config(page_title="Galactic Ops Dashboard", page_icon="🛰️", layout="wide")
 
 # -----------------------------
@@ -24,75 +29,87 @@ with st.sidebar:
     th_batt = st.slider("Battery low threshold", 0, 100, 30)
     th_solar = st.slider("Solar output low threshold (kW)", 0, 200, 60)
     th_temp_hi = st.slider("Coolant temp HIGH (°C)", 40, 200, 120)
-    th_comm = st.selectbox("Comms minimum status", ["Outage","Degraded","Nominal"], index=1)
+    th_comm = st.selectbox("Comms minimum status", COMM_NAME, index=1)
 
 # -----------------------------
 # Telemetry (demo)
 # -----------------------------
-@st.cache_data(show_spinner=False)
-def initial_state():
-    return {
-        "ship": "GI-01 ORION",
-        "fuel_pct": 76.0,
-        "battery_pct": 88.0,
-        "solar_kw": 95.0,
-        "coolant_c": 87.0,
-        "comms": "Nominal",
-    }
-
-state = initial_state().copy()
+BASELINE = {
+    "ship": "GI-01 ORION",
+    "fuel_pct": 76.0,
+    "battery_pct": 88.0,
+    "solar_kw": 95.0,
+    "coolant_c": 87.0,
+}
 
-def apply_jitter(val, pct):
-    if pct <= 0: return val
-    span = val * pct / 100.0
-    return max(0, val + random.uniform(-span, span))
+JITTER_KEYS = ("fuel_pct", "battery_pct", "solar_kw", "coolant_c")
+JITTER_BASE = np.array([BASELINE[k] for k in JITTER_KEYS], dtype=np.float64)
 
-state["fuel_pct"] = round(apply_jitter(state["fuel_pct"], jitter), 1)
-state["battery_pct"] = round(apply_jitter(state["battery_pct"], jitter), 1)
-state["solar_kw"] = round(apply_jitter(state["solar_kw"], jitter), 1)
-state["coolant_c"] = round(apply_jitter(state["coolant_c"], jitter), 1)
-state["comms"] = random.choice(["Nominal","Nominal","Nominal","Degraded"])  # biased toward Nominal
-
-# Derived metric: map solar (0–200 kW) to 0–100 scale for a dial, and thermal margin
-solar_pct = max(0, min(100, (state["solar_kw"] / 200.0) * 100.0))
-thermal_margin = max(0, min(100, 200.0 - state["coolant_c"]))  # 200°C = 0 margin, 100% = cool
+def apply_jitter(base, pct, rng):
+    # One uniform draw for every channel; spans collapse to 0 when pct is 0
+    spans = base * (pct / 100.0)
+    return np.maximum(0.0, base + rng.uniform(-spans, spans))
 
 # -----------------------------
 # Plotly Gauge helpers
 # -----------------------------
-def radial_gauge(title: str, value: float, vmin: float = 0, vmax: float = 100,
-                 red_max: float | None = None, yellow_max: float | None = None,
-                 units: str = "%", threshold: float | None = None):
-    """Make a pretty radial gauge with green/yellow/red bands and a threshold marker."""
-    steps = []
-    # Bands: green -> yellow -> red (optional if provided)
-    if yellow_max is not None:
-        steps.append(dict(range=[vmin, yellow_max], color="#2ecc71"))
-    if red_max is not None and yellow_max is not None:
-        steps.append(dict(range=[yellow_max, red_max], color="#f1c40f"))
-        steps.append(dict(range=[red_max, vmax], color="#e74c3c"))
+# Default green/yellow/red bands for the (0, 100, red_max=30, yellow_max=60) gauges
+_STEPS_DEFAULT = [
+    dict(range=[0, 60], color="#2ecc71"),
+    dict(range=[60, 30], color="#f1c40f"),
+    dict(range=[30, 100], color="#e74c3c"),
+]
+
+# Static gauge layout is built once per session for each (title, range, bands, units)
+# key; radial_gauge only sets value/threshold on that session's figure.
+def _make_gauge_skeleton(title: str, vmin: float, vmax: float,
+                         red_max: float | None, yellow_max: float | None, units: str):
+    if (vmin, vmax, red_max, yellow_max) == (0, 100, 30, 60):
+        steps = _STEPS_DEFAULT
     else:
-        steps.append(dict(range=[vmin, vmax], color="#2ecc71"))
+        steps = []
+        # Bands: green -> yellow -> red (optional if provided)
+        if yellow_max is not None:
+            steps.append(dict(range=[vmin, yellow_max], color="#2ecc71"))
+        if red_max is not None and yellow_max is not None:
+            steps.append(dict(range=[yellow_max, red_max], color="#f1c40f"))
+            steps.append(dict(range=[red_max, vmax], color="#e74c3c"))
+        else:
+            steps.append(dict(range=[vmin, vmax], color="#2ecc71"))
 
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
-        value=value,
         number={'suffix': f" {units}"},
         title={'text': f"<b>{title}</b>"},
         gauge={
             'axis': {'range': [vmin, vmax]},
             'bar': {'color': "#1f77b4"},
-            'steps': [{'range': s['range'], 'color': s['color']} for s in steps],
-            'threshold': ({
+            'steps': steps,
+            'threshold': {
                 'line': {'color': "#8e44ad", 'width': 4},
                 'thickness': 0.75,
-                'value': threshold
-            } if threshold is not None else None)
+            }
         }
     ))
     fig.update_layout(margin=dict(l=10, r=10, t=50, b=10), height=260)
     return fig
 
+def radial_gauge(title: str, value: float, vmin: float = 0, vmax: float = 100,
+                 red_max: float | None = None, yellow_max: float | None = None,
+                 units: str = "%", threshold: float | None = None):
+    """Make a pretty radial gauge with green/yellow/red bands and a threshold marker."""
+    # Skeletons live in session_state, not cache_resource, so concurrent
+    # sessions never write their value/threshold into a shared figure
+    if "gauges" not in st.session_state:
+        st.session_state.gauges = {}
+    key = (title, vmin, vmax, red_max, yellow_max, units)
+    if key not in st.session_state.gauges:
+        st.session_state.gauges[key] = _make_gauge_skeleton(title, vmin, vmax, red_max, yellow_max, units)
+    fig = st.session_state.gauges[key]
+    fig.data[0].value = value
+    fig.data[0].gauge.threshold.value = threshold
+    return fig
+
 def bullet_gauge(title: str, value: float, vmin: float, vmax: float, zones: list[tuple[float, float, str]]):
     """Horizontal bullet gauge for categorical/quality signals (e.g., comms)."""
     shapes = []
@@ -112,98 +129,151 @@ def bullet_gauge(title: str, value: float, vmin: float, vmax: float, zones: list
     return fig
 
 # -----------------------------
-# Top KPIs (numbers)
+# Alert checks
 # -----------------------------
-k1, k2, k3, k4, k5 = st.columns(5)
-k1.metric("⛽ Fuel", f"{state['fuel_pct']} %")
-k2.metric("🔋 Battery", f"{state['battery_pct']} %")
-k3.metric("☀️ Solar Output", f"{state['solar_kw']} kW")
-k4.metric("❄️ Coolant Temp", f"{state['coolant_c']} °C")
-k5.metric("📡 Comms", state["comms"])
-st.divider()
+@functools.lru_cache(maxsize=128)
+def _status_bad_pure(fuel, batt, solar, coolant, comm_code,
+                     th_fuel, th_batt, th_solar, th_temp_hi, th_comm_code) -> tuple[str, ...]:
+    msgs = []
+    if fuel <= th_fuel: msgs.append(f"Fuel low: {fuel}% ≤ {th_fuel}%")
+    if batt <= th_batt: msgs.append(f"Battery low: {batt}% ≤ {th_batt}%")
+    if solar <= th_solar: msgs.append(f"Solar output low: {solar} kW ≤ {th_solar} kW")
+    if coolant >= th_temp_hi: msgs.append(f"Coolant temp high: {coolant} °C ≥ {th_temp_hi} °C")
+    if comm_code < th_comm_code:
+        msgs.append(f"Comms below minimum: {COMM_NAME[comm_code]} < {COMM_NAME[th_comm_code]}")
+    return tuple(msgs)
 
-# -----------------------------
-# Snapshot chart
-# -----------------------------
-left, right = st.columns([2, 1])
-with left:
-    st.markdown("#### Systems Snapshot")
-    if "ts_hist" not in st.session_state:
-        st.session_state.ts_hist = pd.DataFrame(columns=["t","Fuel%","Battery%","Solar(kW)","Coolant(°C)"])
-    st.session_state.ts_hist = pd.concat([st.session_state.ts_hist, pd.DataFrame([{
-        "t": datetime.utcnow().strftime("%H:%M:%S"),
-        "Fuel%": state["fuel_pct"],
-        "Battery%": state["battery_pct"],
-        "Solar(kW)": state["solar_kw"],
-        "Coolant(°C)": state["coolant_c"],
-    }])], ignore_index=True)
-    st.line_chart(st.session_state.ts_hist.set_index("t"))
+def status_bad(state):
+    # With jitter at 0 and the sliders untouched, every fragment timer run
+    # passes the same values and hits the cache
+    return _status_bad_pure(
+        state["fuel_pct"], state["battery_pct"], state["solar_kw"], state["coolant_c"], state["comm_code"],
+        th_fuel, th_batt, th_solar, th_temp_hi, COMM_CODE[th_comm],
+    )
 
 # -----------------------------
-# Plotly Gauges (right column)
+# Live telemetry panel — reruns on its own timer; sidebar and helpers stay put
 # -----------------------------
-with right:
-    st.markdown("#### Gauges")
-    gcol1, gcol2 = st.columns(2)
+@st.fragment(run_every=2 if autoupdate else None)
+def telemetry_panel():
+    # Telemetry is resampled only when the auto-update tick advances, so
+    # sidebar tweaks redraw the same sample instead of fresh noise. The tick
+    # moves on the fragment's own timer runs only; full reruns (widget
+    # changes) set "full_rerun" just before calling the panel.
+    full_rerun = st.session_state.pop("full_rerun", False)
+    if autoupdate and not full_rerun:
+        st.session_state.tick = st.session_state.get("tick", 0) + 1
+    tick = st.session_state.get("tick", 0)
+    rng = np.random.default_rng(tick)
 
-    with gcol1:
-        st.plotly_chart(
-            radial_gauge("Fuel", state["fuel_pct"], 0, 100, red_max=30, yellow_max=60, units="%", threshold=th_fuel),
-            use_container_width=True
-        )
-        st.plotly_chart(
-            radial_gauge("Solar (scaled)", solar_pct, 0, 100, red_max=30, yellow_max=60, units="%", threshold=(th_solar/200)*100),
-            use_container_width=True
-        )
+    jittered = np.round(apply_jitter(JITTER_BASE, jitter, rng), 1).tolist()
+    state = {
+        **BASELINE,
+        **dict(zip(JITTER_KEYS, jittered)),
+        "comm_code": COMM_CODE[rng.choice(["Nominal","Nominal","Nominal","Degraded"])],  # biased toward Nominal
+    }
 
-    with gcol2:
-        st.plotly_chart(
-            radial_gauge("Battery", state["battery_pct"], 0, 100, red_max=30, yellow_max=60, units="%", threshold=th_batt),
-            use_container_width=True
-        )
+    # Derived metric: map solar (0–200 kW) to 0–100 scale for a dial, and thermal margin (200°C = 0 margin, 100% = cool)
+    solar_pct, thermal_margin = np.clip(
+        [(state["solar_kw"] / 200.0) * 100.0, 200.0 - state["coolant_c"]], 0, 100
+    ).tolist()
+
+    # -----------------------------
+    # Top KPIs (numbers)
+    # -----------------------------
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric("⛽ Fuel", f"{state['fuel_pct']} %")
+    k2.metric("🔋 Battery", f"{state['battery_pct']} %")
+    k3.metric("☀️ Solar Output", f"{state['solar_kw']} kW")
+    k4.metric("❄️ Coolant Temp", f"{state['coolant_c']} °C")
+    k5.metric("📡 Comms", COMM_NAME[state["comm_code"]])
+    st.divider()
+
+    # -----------------------------
+    # Snapshot chart
+    # -----------------------------
+    left, right = st.columns([2, 1])
+    with left:
+        st.markdown("#### Systems Snapshot")
+        if "ring" not in st.session_state:
+            st.session_state.ring = {
+                "t": np.empty(HIST_LEN, np.int64),  # epoch ns
+                "Fuel%": np.empty(HIST_LEN, np.float64),
+                "Battery%": np.empty(HIST_LEN, np.float64),
+                "Solar(kW)": np.empty(HIST_LEN, np.float64),
+                "Coolant(°C)": np.empty(HIST_LEN, np.float64),
+            }
+            st.session_state.head = 0
+            st.session_state.count = 0
+        ring = st.session_state.ring
+        # One sample per tick; a rerun on the same tick (e.g. a slider change)
+        # overwrites the newest sample so the chart tracks the KPIs
+        if st.session_state.get("hist_tick") != tick:
+            st.session_state.hist_tick = tick
+            idx = st.session_state.head % HIST_LEN
+            st.session_state.head += 1
+            st.session_state.count = min(st.session_state.count + 1, HIST_LEN)
+        else:
+            idx = (st.session_state.head - 1) % HIST_LEN
+        ring["t"][idx] = time.time_ns()
+        ring["Fuel%"][idx] = state["fuel_pct"]
+        ring["Battery%"][idx] = state["battery_pct"]
+        ring["Solar(kW)"][idx] = state["solar_kw"]
+        ring["Coolant(°C)"][idx] = state["coolant_c"]
+        # Oldest-to-newest slot order; only materialize a DataFrame at chart time
+        order = (np.arange(st.session_state.count) + st.session_state.head - st.session_state.count) % HIST_LEN
+        hist = pd.DataFrame({k: v[order] for k, v in ring.items()})
+        hist["t"] = pd.to_datetime(hist["t"], unit="ns")
+        st.line_chart(hist.set_index("t"))
+
+    # -----------------------------
+    # Plotly Gauges (right column)
+    # -----------------------------
+    with right:
+        st.markdown("#### Gauges")
+        gcol1, gcol2 = st.columns(2)
+
+        with gcol1:
+            st.plotly_chart(
+                radial_gauge("Fuel", state["fuel_pct"], 0, 100, red_max=30, yellow_max=60, units="%", threshold=th_fuel),
+                use_container_width=True
+            )
+            st.plotly_chart(
+                radial_gauge("Solar (scaled)", solar_pct, 0, 100, red_max=30, yellow_max=60, units="%", threshold=(th_solar/200)*100),
+                use_container_width=True
+            )
+
+        with gcol2:
+            st.plotly_chart(
+                radial_gauge("Battery", state["battery_pct"], 0, 100, red_max=30, yellow_max=60, units="%", threshold=th_batt),
+                use_container_width=True
+            )
+            st.plotly_chart(
+                radial_gauge("Thermal Margin", thermal_margin, 0, 100, red_max=30, yellow_max=60, units="%", threshold=(200 - th_temp_hi)),
+                use_container_width=True
+            )
+
+        # Comms bullet gauge (Nominal/Degraded/Outage → 100/50/0)
+        comm_val = state["comm_code"] * 50
         st.plotly_chart(
-            radial_gauge("Thermal Margin", thermal_margin, 0, 100, red_max=30, yellow_max=60, units="%", threshold=(200 - th_temp_hi)),
+            bullet_gauge(
+                f"Comms (min {th_comm})",
+                comm_val, 0, 100,
+                zones=[(0, 33, "#e74c3c"), (33, 67, "#f1c40f"), (67, 100, "#2ecc71")]
+            ),
             use_container_width=True
         )
+        if state["comm_code"] < COMM_CODE[th_comm]:
+            st.warning(f"Comms below minimum: {COMM_NAME[state['comm_code']]} < {th_comm}")
 
-    # Comms bullet gauge (Nominal/Degraded/Outage → 100/50/0)
-    comm_val = {"Nominal": 100, "Degraded": 50, "Outage": 0}[state["comms"]]
-    comm_min_required = {"Outage": 0, "Degraded": 50, "Nominal": 100}[th_comm]
-    st.plotly_chart(
-        bullet_gauge(
-            f"Comms (min {th_comm})",
-            comm_val, 0, 100,
-            zones=[(0, 33, "#e74c3c"), (33, 67, "#f1c40f"), (67, 100, "#2ecc71")]
-        ),
-        use_container_width=True
-    )
-    if comm_val < comm_min_required:
-        st.warning(f"Comms below minimum: {state['comms']} < {th_comm}")
-
-# -----------------------------
-# Alerts
-# -----------------------------
-def status_bad():
-    msgs = []
-    if state["fuel_pct"] <= th_fuel: msgs.append(f"Fuel low: {state['fuel_pct']}% ≤ {th_fuel}%")
-    if state["battery_pct"] <= th_batt: msgs.append(f"Battery low: {state['battery_pct']}% ≤ {th_batt}%")
-    if state["solar_kw"] <= th_solar: msgs.append(f"Solar output low: {state['solar_kw']} kW ≤ {th_solar} kW")
-    if state["coolant_c"] >= th_temp_hi: msgs.append(f"Coolant temp high: {state['coolant_c']} °C ≥ {th_temp_hi} °C")
-    comm_order = {"Outage":0,"Degraded":1,"Nominal":2}
-    if comm_order[state["comms"]] < comm_order[th_comm]:
-        msgs.append(f"Comms below minimum: {state['comms']} < {th_comm}")
-    return msgs
-
-issues = status_bad()
-if issues:
-    st.error("⚠️ Alerts detected:\n- " + "\n- ".join(issues))
-else:
-    st.success("All systems nominal.")
-
-# -----------------------------
-# Auto-update loop (optional)
-# -----------------------------
-if autoupdate:
-    time.sleep(2)
-    st.rerun()
+    # -----------------------------
+    # Alerts
+    # -----------------------------
+    issues = status_bad(state)
+    if issues:
+        st.error("⚠️ Alerts detected:\n- " + "\n- ".join(issues))
+    else:
+        st.success("All systems nominal.")
 
+st.session_state.full_rerun = True
+telemetry_panel()
@@ -1,10 +1,15 @@
+import functools
 import time
-from datetime import datetime
-import random
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 
+HIST_LEN = 300  # samples kept for the trend chart (15 min at the 3 s refresh)
+# Comms status is carried as an int code so alert checks compare ints, not strings
+COMM_CODE = {"Outage": 0, "Degraded": 1, "Nominal": 2}
+COMM_NAME = ["Outage", "Degraded", "Nominal"]
+
 st.set_page_config(page_title="Galactic Ops Dashboard", page_icon="🛰️", layout="wide")
 
 # -----------------------------
@@ -23,55 +28,52 @@ with st.sidebar:
     th_batt = st.slider("Battery low threshold", 0, 100, 30)
     th_solar = st.slider("Solar output low threshold (kW)", 0, 200, 60)
     th_temp_hi = st.slider("Coolant temp HIGH (°C)", 40, 200, 120)
-    th_comm = st.selectbox("Comms minimum status", ["Outage","Degraded","Nominal"], index=1)
+    th_comm = st.selectbox("Comms minimum status", COMM_NAME, index=1)
 
 # -----------------------------
 # Telemetry (demo)
 # -----------------------------
-@st.cache_data(show_spinner=False)
-def initial_state():
-    return {
-        "ship": "GI-01 ORION",
-        "fuel_pct": 76.0,
-        "battery_pct": 88.0,
-        "solar_kw": 95.0,
-        "coolant_c": 87.0,
-        "comms": "Nominal",
-    }
-
-state = initial_state().copy()
-
-def apply_jitter(val, pct):
-    if pct <= 0: return val
-    span = val * pct / 100.0
-    return max(0, val + random.uniform(-span, span))
+BASELINE = {
+    "ship": "GI-01 ORION",
+    "fuel_pct": 76.0,
+    "battery_pct": 88.0,
+    "solar_kw": 95.0,
+    "coolant_c": 87.0,
+}
 
-# live jitter for demo
-state["fuel_pct"] = round(apply_jitter(state["fuel_pct"], jitter), 1)
-state["battery_pct"] = round(apply_jitter(state["battery_pct"], jitter), 1)
-state["solar_kw"] = round(apply_jitter(state["solar_kw"], jitter), 1)
-state["coolant_c"] = round(apply_jitter(state["coolant_c"], jitter), 1)
-state["comms"] = random.choice(["Nominal","Nominal","Nominal","Degraded"])  # biased toward Nominal
+JITTER_KEYS = ("fuel_pct", "battery_pct", "solar_kw", "coolant_c")
+JITTER_BASE = np.array([BASELINE[k] for k in JITTER_KEYS], dtype=np.float64)
 
-# Derived metric: map solar (0–200 kW) to 0–100 scale for dial, and thermal margin
-solar_pct = max(0, min(100, (state["solar_kw"] / 200.0) * 100.0))
-thermal_margin = max(0, min(100, 200.0 - state["coolant_c"]))  # 200°C = 0 margin, 100% = cool
+def apply_jitter(base, pct, rng):
+    # One uniform draw for every channel; spans collapse to 0 when pct is 0
+    spans = base * (pct / 100.0)
+    return np.maximum(0.0, base + rng.uniform(-spans, spans))
 
 # -----------------------------
 # Plotly Gauge helper
 # -----------------------------
+# Default green/yellow/red bands for the (0, 100, red_max=30, yellow_max=60) gauges
+_STEPS_DEFAULT = [
+    dict(range=[0, 60], color="#2ecc71"),
+    dict(range=[60, 30], color="#f1c40f"),
+    dict(range=[30, 100], color="#e74c3c"),
+]
+
 def radial_gauge(title: str, value: float, vmin: float = 0, vmax: float = 100,
                  red_max: float | None = None, yellow_max: float | None = None,
                  units: str = "%", threshold: float | None = None):
-    steps = []
-    # color bands
-    if yellow_max is not None:
-        steps.append(dict(range=[vmin, yellow_max], color="#2ecc71"))
-    if red_max is not None and yellow_max is not None:
-        steps.append(dict(range=[yellow_max, red_max], color="#f1c40f"))
-        steps.append(dict(range=[red_max, vmax], color="#e74c3c"))
-    if not steps:
-        steps.append(dict(range=[vmin, vmax], color="#2ecc71"))
+    if (vmin, vmax, red_max, yellow_max) == (0, 100, 30, 60):
+        steps = _STEPS_DEFAULT
+    else:
+        steps = []
+        # color bands
+        if yellow_max is not None:
+            steps.append(dict(range=[vmin, yellow_max], color="#2ecc71"))
+        if red_max is not None and yellow_max is not None:
+            steps.append(dict(range=[yellow_max, red_max], color="#f1c40f"))
+            steps.append(dict(range=[red_max, vmax], color="#e74c3c"))
+        if not steps:
+            steps.append(dict(range=[vmin, vmax], color="#2ecc71"))
 
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
@@ -93,151 +95,195 @@ def radial_gauge(title: str, value: float, vmin: float = 0, vmax: float = 100,
     return fig
 
 # -----------------------------
-# Top KPIs (numbers)
+# Alert checks
 # -----------------------------
-k1, k2, k3, k4, k5 = st.columns(5)
-k1.metric("⛽ Fuel", f"{state['fuel_pct']} %")
-k2.metric("🔋 Battery", f"{state['battery_pct']} %")
-k3.metric("☀️ Solar Output", f"{state['solar_kw']} kW")
-k4.metric("❄️ Coolant Temp", f"{state['coolant_c']} °C")
-k5.metric("📡 Comms", state["comms"])
-st.divider()
+@functools.lru_cache(maxsize=128)
+def _status_bad_pure(fuel, batt, solar, coolant, comm_code,
+                     th_fuel, th_batt, th_solar, th_temp_hi, th_comm_code) -> tuple[str, ...]:
+    msgs = []
+    if fuel <= th_fuel: msgs.append(f"Fuel low: {fuel}% ≤ {th_fuel}%")
+    if batt <= th_batt: msgs.append(f"Battery low: {batt}% ≤ {th_batt}%")
+    if solar <= th_solar: msgs.append(f"Solar output low: {solar} kW ≤ {th_solar} kW")
+    if coolant >= th_temp_hi: msgs.append(f"Coolant temp high: {coolant} °C ≥ {th_temp_hi} °C")
+    if comm_code < th_comm_code:
+        msgs.append(f"Comms below minimum: {COMM_NAME[comm_code]} < {COMM_NAME[th_comm_code]}")
+    return tuple(msgs)
+
+def status_bad(state):
+    # With jitter at 0 and the sliders untouched, every fragment timer run
+    # passes the same values and hits the cache
+    return _status_bad_pure(
+        state["fuel_pct"], state["battery_pct"], state["solar_kw"], state["coolant_c"], state["comm_code"],
+        th_fuel, th_batt, th_solar, th_temp_hi, COMM_CODE[th_comm],
+    )
 
 # -----------------------------
-# Time Series (Plotly LINE)
+# Live telemetry panel — reruns on its own timer; sidebar and helpers stay put
 # -----------------------------
-st.markdown("### 📈 Realtime Telemetry Trends")
-if "ts_hist" not in st.session_state:
-    st.session_state.ts_hist = pd.DataFrame(columns=[
-        "t","Fuel%","Battery%","Solar%","ThermalMargin%"
-    ])
-
-st.session_state.ts_hist = pd.concat([st.session_state.ts_hist, pd.DataFrame([{
-    "t": datetime.utcnow().strftime("%H:%M:%S"),
-    "Fuel%": state["fuel_pct"],
-    "Battery%": state["battery_pct"],
-    "Solar%": round(solar_pct, 1),
-    "ThermalMargin%": round(thermal_margin, 1),
-}])], ignore_index=True)
-
-fig_line = go.Figure()
-for col in ["Fuel%","Battery%","Solar%","ThermalMargin%"]:
-    fig_line.add_trace(go.Scatter(
-        x=st.session_state.ts_hist["t"],
-        y=st.session_state.ts_hist[col],
-        mode="lines+markers",
-        name=col
-    ))
-fig_line.update_layout(
-    height=350,
-    margin=dict(l=10, r=10, t=30, b=10),
-    yaxis_title="Percent",
-    xaxis_title="UTC Time"
-)
-st.plotly_chart(fig_line, use_container_width=True)
+@st.fragment(run_every=3 if autoupdate else None)
+def telemetry_panel():
+    # Telemetry is resampled only when the auto-update tick advances, so
+    # sidebar tweaks redraw the same sample instead of fresh noise. The tick
+    # moves on the fragment's own timer runs only; full reruns (widget
+    # changes) set "full_rerun" just before calling the panel.
+    full_rerun = st.session_state.pop("full_rerun", False)
+    if autoupdate and not full_rerun:
+        st.session_state.tick = st.session_state.get("tick", 0) + 1
+    tick = st.session_state.get("tick", 0)
+    rng = np.random.default_rng(tick)
 
-st.divider()
+    # live jitter for demo
+    jittered = np.round(apply_jitter(JITTER_BASE, jitter, rng), 1).tolist()
+    state = {
+        **BASELINE,
+        **dict(zip(JITTER_KEYS, jittered)),
+        "comm_code": COMM_CODE[rng.choice(["Nominal","Nominal","Nominal","Degraded"])],  # biased toward Nominal
+    }
 
-# -----------------------------
-# Snapshot (Plotly BAR + PIE)
-# -----------------------------
-st.markdown("### 📊 System Metrics Overview")
-
-colA, colB, colC = st.columns([2,1,1])
-
-# BAR: current % metrics side-by-side
-with colA:
-    bar_fig = go.Figure(data=[
-        go.Bar(name="Battery%", x=["Battery"], y=[state["battery_pct"]]),
-        go.Bar(name="ThermalMargin%", x=["Thermal"], y=[thermal_margin]),
-    ])
-    bar_fig.update_layout(
-        barmode="group",
+    # Derived metric: map solar (0–200 kW) to 0–100 scale for dial, and thermal margin (200°C = 0 margin, 100% = cool)
+    solar_pct, thermal_margin = np.clip(
+        [(state["solar_kw"] / 200.0) * 100.0, 200.0 - state["coolant_c"]], 0, 100
+    ).tolist()
+
+    # -----------------------------
+    # Top KPIs (numbers)
+    # -----------------------------
+    k1, k2, k3, k4, k5 = st.columns(5)
+    k1.metric("⛽ Fuel", f"{state['fuel_pct']} %")
+    k2.metric("🔋 Battery", f"{state['battery_pct']} %")
+    k3.metric("☀️ Solar Output", f"{state['solar_kw']} kW")
+    k4.metric("❄️ Coolant Temp", f"{state['coolant_c']} °C")
+    k5.metric("📡 Comms", COMM_NAME[state["comm_code"]])
+    st.divider()
+
+    # -----------------------------
+    # Time Series (Plotly LINE)
+    # -----------------------------
+    st.markdown("### 📈 Realtime Telemetry Trends")
+    if "rows" not in st.session_state:
+        st.session_state.rows = []
+
+    # One sample per tick; a rerun on the same tick (e.g. a slider change)
+    # overwrites the newest sample so the chart tracks the KPIs
+    sample = {
+        "t": time.time_ns(),
+        "Fuel%": state["fuel_pct"],
+        "Battery%": state["battery_pct"],
+        "Solar%": round(solar_pct, 1),
+        "ThermalMargin%": round(thermal_margin, 1),
+    }
+    if st.session_state.get("hist_tick") != tick:
+        st.session_state.hist_tick = tick
+        st.session_state.rows.append(sample)
+        st.session_state.rows = st.session_state.rows[-HIST_LEN:]
+    else:
+        st.session_state.rows[-1] = sample
+    ts_hist = pd.DataFrame(st.session_state.rows)
+    ts_hist["t"] = pd.to_datetime(ts_hist["t"], unit="ns")
+
+    fig_line = go.Figure()
+    for col in ["Fuel%","Battery%","Solar%","ThermalMargin%"]:
+        fig_line.add_trace(go.Scatter(
+            x=ts_hist["t"],
+            y=ts_hist[col],
+            mode="lines+markers",
+            name=col
+        ))
+    fig_line.update_layout(
         height=350,
         margin=dict(l=10, r=10, t=30, b=10),
-        yaxis=dict(range=[0, 100], title="Percent")
-    )
-    st.plotly_chart(bar_fig, use_container_width=True)
-with colB:
-    st.plotly_chart(
-        radial_gauge("Fuel", state["fuel_pct"], 0, 100, red_max=30, yellow_max=60, units="%", threshold=th_fuel),
-        use_container_width=True
-    )
-with colC:
-    st.plotly_chart(
-        radial_gauge("Solar (scaled)", solar_pct, 0, 100, red_max=30, yellow_max=60, units="%", threshold=(th_solar/200)*100),
-        use_container_width=True
+        yaxis_title="Percent",
+        xaxis_title="UTC Time",
+        xaxis_type="date"
     )
+    st.plotly_chart(fig_line, use_container_width=True)
 
-st.divider()
+    st.divider()
 
-# -----------------------------
-# Gauges (Plotly radial)
-# -----------------------------
-st.markdown("### 📟 Alerts & System Console")
+    # -----------------------------
+    # Snapshot (Plotly BAR + PIE)
+    # -----------------------------
+    st.markdown("### 📊 System Metrics Overview")
 
-# -----------------------------
-# Alerts (black background + green text + blinking cursor)
-# -----------------------------
-def status_bad():
-    msgs = []
-    if state["fuel_pct"] <= th_fuel: msgs.append(f"Fuel low: {state['fuel_pct']}% ≤ {th_fuel}%")
-    if state["battery_pct"] <= th_batt: msgs.append(f"Battery low: {state['battery_pct']}% ≤ {th_batt}%")
-    if state["solar_kw"] <= th_solar: msgs.append(f"Solar output low: {state['solar_kw']} kW ≤ {th_solar} kW")
-    if state["coolant_c"] >= th_temp_hi: msgs.append(f"Coolant temp high: {state['coolant_c']} °C ≥ {th_temp_hi} °C")
-    comm_order = {"Outage":0,"Degraded":1,"Nominal":2}
-    if comm_order[state["comms"]] < comm_order[th_comm]:
-        msgs.append(f"Comms below minimum: {state['comms']} < {th_comm}")
-    return msgs
-
-# Inject blinking cursor CSS
-st.markdown("""
-<style>
-.terminal {
-    background-color: #000;
-    color: #00FF00;
-    font-family: 'Courier New', monospace;
-    padding: 15px;
-    border-radius: 8px;
-    border: 1px solid #00FF00;
-    font-size: 16px;
-}
-@keyframes blink {
-    0%, 49% { opacity: 1; }
-    50%, 100% { opacity: 0; }
-}
-.cursor {
-    display: inline-block;
-    width: 10px;
-    height: 1em;
-    background: #00FF00;
-    margin-left: 4px;
-    animation: blink 1s step-start infinite;
-}
-</style>
-""", unsafe_allow_html=True)
-
-issues = status_bad()
-if issues:
-    alert_html = f"""
-    <div class="terminal">
-        <b>⚠️ ALERTS DETECTED</b><br>
-        {"<br>".join(f"- {msg}" for msg in issues)}
-    </div>
-    """
-else:
-    alert_html = """
-    <div class="terminal">
-        ✅ All systems nominal<span class="cursor"></span>
-    </div>
-    """
-
-st.markdown(alert_html, unsafe_allow_html=True)
+    colA, colB, colC = st.columns([2,1,1])
 
-# -----------------------------
-# Auto-update loop
-# -----------------------------
-if autoupdate:
-    time.sleep(3)
-    st.rerun()
+    # BAR: current % metrics side-by-side
+    with colA:
+        bar_fig = go.Figure(data=[
+            go.Bar(name="Battery%", x=["Battery"], y=[state["battery_pct"]]),
+            go.Bar(name="ThermalMargin%", x=["Thermal"], y=[thermal_margin]),
+        ])
+        bar_fig.update_layout(
+            barmode="group",
+            height=350,
+            margin=dict(l=10, r=10, t=30, b=10),
+            yaxis=dict(range=[0, 100], title="Percent")
+        )
+        st.plotly_chart(bar_fig, use_container_width=True)
+    with colB:
+        st.plotly_chart(
+            radial_gauge("Fuel", state["fuel_pct"], 0, 100, red_max=30, yellow_max=60, units="%", threshold=th_fuel),
+            use_container_width=True
+        )
+    with colC:
+        st.plotly_chart(
+            radial_gauge("Solar (scaled)", solar_pct, 0, 100, red_max=30, yellow_max=60, units="%", threshold=(th_solar/200)*100),
+            use_container_width=True
+        )
+
+    st.divider()
+
+    # -----------------------------
+    # Gauges (Plotly radial)
+    # -----------------------------
+    st.markdown("### 📟 Alerts & System Console")
+
+    # -----------------------------
+    # Alerts (black background + green text + blinking cursor)
+    # -----------------------------
+    # Inject blinking cursor CSS
+    st.markdown("""
+    <style>
+    .terminal {
+        background-color: #000;
+        color: #00FF00;
+        font-family: 'Courier New', monospace;
+        padding: 15px;
+        border-radius: 8px;
+        border: 1px solid #00FF00;
+        font-size: 16px;
+    }
+    @keyframes blink {
+        0%, 49% { opacity: 1; }
+        50%, 100% { opacity: 0; }
+    }
+    .cursor {
+        display: inline-block;
+        width: 10px;
+        height: 1em;
+        background: #00FF00;
+        margin-left: 4px;
+        animation: blink 1s step-start infinite;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+    issues = status_bad(state)
+    if issues:
+        alert_html = f"""
+        <div class="terminal">
+            <b>⚠️ ALERTS DETECTED</b><br>
+            {"<br>".join(f"- {msg}" for msg in issues)}
+        </div>
+        """
+    else:
+        alert_html = """
+        <div class="terminal">
+            ✅ All systems nominal<span class="cursor"></span>
+        </div>
+        """
+
+    st.markdown(alert_html, unsafe_allow_html=True)
 
+st.session_state.full_rerun = True
+telemetry_panel()